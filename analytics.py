@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+
+# Visit-count buckets used for the frequency distribution
+FREQUENCY_BINS = [0, 1, 2, 5, 10, 20, np.inf]
+FREQUENCY_LABELS = ["1", "2", "3-5", "6-10", "11-20", "21+"]
+
+def build_visit_sequences(members):
+    """Build per-member visit sequences from member visit histories.
+
+    Expects one row per member with user_id, school_organization and
+    check_in_times (every check-in for that member). Expands to one row
+    per visit and adds the visit number, days since the member's previous
+    visit, first visit date and monthly cohort.
+    """
+    df = pd.DataFrame(members, columns=["user_id", "school_organization", "check_in_times"])
+    df = df.explode("check_in_times", ignore_index=True).rename(columns={"check_in_times": "check_in_time"})
+    df = df.dropna(subset=["check_in_time"])
+    if df.empty:
+        return df.assign(visit_number=[], days_since_prev=[], first_visit=[], cohort=[], period=[])
+
+    df["check_in_time"] = pd.to_datetime(df["check_in_time"], utc=True, format="ISO8601").dt.tz_convert("Asia/Manila")
+    df = df.sort_values(["user_id", "check_in_time"], kind="mergesort").reset_index(drop=True)
+
+    grouped = df.groupby("user_id", sort=False)["check_in_time"]
+    df["visit_number"] = grouped.cumcount() + 1
+    df["days_since_prev"] = grouped.diff().dt.total_seconds() / 86400
+    df["first_visit"] = grouped.transform("min")
+
+    # Integer month index keeps the cohort offset a plain vectorized subtraction
+    month_index = df["check_in_time"].dt.year * 12 + df["check_in_time"].dt.month - 1
+    cohort_index = month_index.groupby(df["user_id"], sort=False).transform("min")
+    df["period"] = (month_index - cohort_index).astype(int)
+    df["cohort"] = (cohort_index // 12).astype(str) + "-" + (cohort_index % 12 + 1).map("{:02d}".format)
+    return df
+
+def cohort_retention_matrix(sequences, max_periods=12, as_of=None):
+    """Share of each monthly cohort that visited again N months after joining.
+
+    Months with no returning members show as 0; months a cohort hasn't
+    reached yet (relative to as_of, default now) are left blank.
+    """
+    if sequences.empty:
+        return pd.DataFrame()
+
+    as_of = pd.Timestamp.now(tz="Asia/Manila") if as_of is None else pd.Timestamp(as_of)
+    periods = range(max_periods + 1)
+
+    active = sequences[sequences["period"] <= max_periods].drop_duplicates(["user_id", "period"])
+    counts = active.pivot_table(index="cohort", columns="period", values="user_id", aggfunc="count", fill_value=0)
+    counts = counts.reindex(columns=periods, fill_value=0)
+    # Every member visits in period 0, so that column is the cohort size
+    matrix = counts.div(counts[0], axis=0)
+
+    cohort_months = pd.PeriodIndex(matrix.index, freq="M")
+    elapsed = (as_of.year * 12 + as_of.month) - (cohort_months.year * 12 + cohort_months.month)
+    future = np.arange(max_periods + 1)[np.newaxis, :] > np.asarray(elapsed)[:, np.newaxis]
+    matrix = matrix.mask(future)
+    matrix.columns = [f"Month {p}" for p in periods]
+    return matrix
+
+def return_rate(sequences, within_days=30, as_of=None):
+    """Fraction of members whose second visit came within N days of their first.
+
+    Only members who joined at least N days before as_of (default now) are
+    counted, since newer members haven't had the full window to return.
+    """
+    if sequences.empty:
+        return None
+
+    as_of = pd.Timestamp.now(tz="Asia/Manila") if as_of is None else pd.Timestamp(as_of)
+    eligible = sequences[sequences["first_visit"] <= as_of - pd.Timedelta(days=within_days)]
+    members = eligible["user_id"].nunique()
+    second_visits = eligible.loc[eligible["visit_number"] == 2, "days_since_prev"].to_numpy()
+    returned = np.count_nonzero(second_visits <= within_days)
+    return returned / members if members else None
+
+def visit_frequency_distribution(summary):
+    """Number of members per total-visit bucket"""
+    counts = pd.DataFrame(summary, columns=["visit_count"])["visit_count"].astype(float)
+    buckets = pd.cut(counts, bins=FREQUENCY_BINS, labels=FREQUENCY_LABELS)
+    distribution = buckets.value_counts(sort=False).reindex(FREQUENCY_LABELS, fill_value=0)
+    return distribution.rename_axis("Visits").reset_index(name="Members")
+
+def organization_leaderboard(summary, top_n=10):
+    """Rank schools/organizations by repeat visitors, then total visits"""
+    df = pd.DataFrame(summary, columns=["user_id", "visit_count", "total_hours", "school_organization"])
+    if df.empty:
+        return df
+
+    df["school_organization"] = df["school_organization"].fillna("Not Specified").str.strip()
+    df["is_repeat"] = df["visit_count"] > 1
+    board = df.groupby("school_organization").agg(
+        Members=("user_id", "nunique"),
+        Visits=("visit_count", "sum"),
+        Repeat_Visitors=("is_repeat", "sum"),
+        Total_Hours=("total_hours", "sum"),
+    )
+    board["Visits per Member"] = (board["Visits"] / board["Members"]).round(2)
+    board["Total_Hours"] = board["Total_Hours"].round(1)
+    board = board.sort_values(["Repeat_Visitors", "Visits"], ascending=False).head(top_n)
+    board = board.rename(columns={"Repeat_Visitors": "Repeat Visitors", "Total_Hours": "Total Hours"})
+    return board.rename_axis("School/Organization").reset_index()
+
+def top_repeat_visitors(summary, top_n=10):
+    """Members with the most visits"""
+    df = pd.DataFrame(summary, columns=["name", "school_organization", "visit_count", "last_visit"])
+    if df.empty:
+        return df
+    df = df.nlargest(top_n, "visit_count")
+    return df.rename(columns={
+        "name": "Name",
+        "school_organization": "School/Organization",
+        "visit_count": "Visits",
+        "last_visit": "Last Visit"
+    })
+
+def daily_facility_usage(usage_rows, start_date, end_date):
+    """Pivot per-facility daily usage into a dense facility x day frame.
+
+    Expects rows with usage_date, facility_name, facility_type, uses and
+    hours. Days without usage are filled with zero so rolling windows
+    line up across facilities.
+    """
+    df = pd.DataFrame(usage_rows, columns=["usage_date", "facility_name", "facility_type", "uses", "hours"])
+    days = pd.date_range(start_date, end_date, freq="D")
+    if df.empty:
+        return pd.DataFrame(index=days), pd.DataFrame(index=days), {}
+
+    df["usage_date"] = pd.to_datetime(df["usage_date"])
+    df["hours"] = df["hours"].fillna(0)
+    facility_types = dict(zip(df["facility_name"], df["facility_type"]))
+    uses = df.pivot_table(index="usage_date", columns="facility_name", values="uses", aggfunc="sum", fill_value=0)
+    hours = df.pivot_table(index="usage_date", columns="facility_name", values="hours", aggfunc="sum", fill_value=0)
+    return uses.reindex(days, fill_value=0), hours.reindex(days, fill_value=0), facility_types
+
+def forecast_facility_demand(uses, hours, facility_types, window=7, alpha=0.3, horizon=7, open_hours=8):
+    """Forecast consumable demand and lease-equipment utilization.
+
+    Uses a trailing moving average and simple exponential smoothing over
+    each facility's daily series; the smoothed level is the per-day
+    forecast carried over the restocking horizon. Utilization is an
+    estimate, since usage hours are a share of the visit duration rather
+    than measured per facility.
+    """
+    if uses.empty or uses.columns.empty:
+        return pd.DataFrame(), pd.DataFrame()
+
+    moving_avg = uses.rolling(window, min_periods=1).mean().iloc[-1]
+    smoothed = uses.ewm(alpha=alpha, adjust=False).mean().iloc[-1]
+    hours_smoothed = hours.ewm(alpha=alpha, adjust=False).mean().iloc[-1]
+    recent_total = uses.iloc[-window:].sum()
+
+    forecast = pd.DataFrame({
+        "Facility": uses.columns,
+        "Type": [facility_types.get(name) for name in uses.columns],
+        f"Uses (last {window} days)": recent_total.to_numpy(),
+        f"{window}-day Avg Uses/Day": moving_avg.round(2).to_numpy(),
+        "Smoothed Uses/Day": smoothed.round(2).to_numpy(),
+        f"Forecast Uses (next {horizon} days)": np.ceil(smoothed.to_numpy() * horizon).astype(int),
+        "Smoothed Hours/Day": hours_smoothed.round(2).to_numpy(),
+        "Est. Utilization": np.clip(hours_smoothed.to_numpy() / open_hours * 100, 0, 100).round(1),
+    })
+
+    consumables = forecast[forecast["Type"] == "consumable"].drop(columns=["Smoothed Hours/Day", "Est. Utilization"])
+    lease = forecast[forecast["Type"] == "lease"]
+    return (
+        consumables.sort_values(f"Forecast Uses (next {horizon} days)", ascending=False),
+        lease.sort_values("Est. Utilization", ascending=False)
+    )
@@ -5,6 +5,7 @@ import pytz
 from supabase import create_client, Client
 import plotly.express as px
 import plotly.graph_objects as go
+import analytics
 
 # Initialize connection to Supabase
 supabase: Client = create_client(
@@ -15,6 +16,9 @@ supabase: Client = create_client(
 # Set Philippine timezone
 PH_TIMEZONE = pytz.timezone('Asia/Manila')
 
+# How often the wall display re-reads the today snapshot
+DISPLAY_REFRESH_SECONDS = 30
+
 def get_ph_time():
     """Get current time in Philippine timezone"""
     return datetime.now(PH_TIMEZONE)
@@ -65,6 +69,8 @@ if 'show_feedback' not in st.session_state:
     st.session_state.show_feedback = None
 if 'checkout_visit_id' not in st.session_state:
     st.session_state.checkout_visit_id = None
+if 'checkout_duration' not in st.session_state:
+    st.session_state.checkout_duration = None
 if 'feedback_success' not in st.session_state:
     st.session_state.feedback_success = False
 if 'feedback_user_name' not in st.session_state:
@@ -83,6 +89,67 @@ def load_active_visits():
         st.error(f"Error loading active visits: {str(e)}")
         return []
 
+@st.cache_data(ttl=3600)
+def load_facilities():
+    """Load the facilities catalog keyed by name, excluding unavailable items"""
+    response = supabase.table('facilities').select(
+        'name, category, type, status'
+    ).neq('status', 'unavailable').order('category').order('name').execute()
+    return {f['name']: f for f in response.data}
+
+@st.cache_data(ttl=DISPLAY_REFRESH_SECONDS, show_spinner=False)
+def load_today_snapshot():
+    """Load the materialized today snapshot (one row, refreshed by database triggers)"""
+    response = supabase.table('today_snapshot').select(
+        'snapshot_date, active_count, check_ins_today, avg_rating_today, ratings_today, updated_at'
+    ).eq('id', 1).limit(1).execute()
+    snapshot = response.data[0] if response.data else None
+
+    # Counts roll over at midnight; the active count carries across days
+    if snapshot and snapshot['snapshot_date'] != get_ph_time().date().isoformat():
+        snapshot = {**snapshot, 'check_ins_today': 0, 'avg_rating_today': None, 'ratings_today': 0}
+    return snapshot
+
+def wall_display_page():
+    """Read-only entrance display served entirely from the today snapshot"""
+    st.markdown("""
+        <style>
+        section[data-testid="stSidebar"], header[data-testid="stHeader"] {
+            display: none;
+        }
+        div[data-testid="stMetricValue"] {
+            font-size: 5rem;
+        }
+        </style>
+        """, unsafe_allow_html=True)
+
+    @st.fragment(run_every=DISPLAY_REFRESH_SECONDS)
+    def snapshot_panel():
+        st.title("🏢 Welcome to Vivita Makerspace!")
+        st.markdown(f"## 📅 {format_ph_time(get_ph_time())}")
+        st.markdown("---")
+
+        try:
+            snapshot = load_today_snapshot()
+        except Exception as e:
+            st.error(f"Error loading today's stats: {str(e)}")
+            return
+
+        if not snapshot:
+            st.info("Today's stats are not available yet")
+            return
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("🧑‍💻 Makers Here Now", snapshot['active_count'])
+        with col2:
+            st.metric("📍 Check-ins Today", snapshot['check_ins_today'])
+        with col3:
+            avg_rating = snapshot['avg_rating_today']
+            st.metric("⭐ Today's Rating", f"{avg_rating:.1f}" if avg_rating else "N/A")
+
+    snapshot_panel()
+
 def check_in_out_page():
     st.header("📍 Check-in/out")
     
@@ -119,9 +186,14 @@ def check_in_out_page():
                 index=4  # Default to highest rating
             )
             
+            try:
+                facility_catalog = load_facilities()
+            except Exception as e:
+                st.error(f"Error loading facilities: {str(e)}")
+                facility_catalog = {}
             facilities_used = st.multiselect(
                 "Facilities used",
-                ["3D Printer", "Laser Cutter", "Robotics", "Tablet", "Desktop Computer", "Cricut", "Polymer Clay", "Heat Press", "Heat Shrink", "Button Pin", "Art Supplies", "Jewelry Making","Plushies"]
+                list(facility_catalog)
             )
             
             comments = st.text_area("Additional comments (optional)")
@@ -136,26 +208,30 @@ def check_in_out_page():
                         "created_at": datetime.now(pytz.UTC).isoformat()
                     }).execute()
                     
-                    # Get facility types from facilities table
-                    facilities_data = supabase.table("facilities").select("name, type").execute()
-                    facility_types = {f['name']: f['type'] for f in facilities_data.data}
-                    
-                    # Record facility usage with correct facility type
-                    for facility in facilities_used:
-                        facility_type = facility_types.get(facility)
-                        if facility_type:  # Only record if we have the facility type
-                            supabase.table("facility_usage").insert({
+                    # Record facility usage in one insert. Per-facility time isn't
+                    # collected, so the visit duration is split evenly across the
+                    # facilities used (an approximation for utilization)
+                    if facilities_used:
+                        visit_duration = st.session_state.checkout_duration
+                        usage_duration = visit_duration / len(facilities_used) if visit_duration is not None else None
+                        recorded_at = datetime.now(pytz.UTC).isoformat()
+                        supabase.table("facility_usage").insert([
+                            {
                                 "visit_id": st.session_state.checkout_visit_id,
                                 "facility_name": facility,
-                                "facility_type": facility_type,
-                                "created_at": datetime.now(pytz.UTC).isoformat()
-                            }).execute()
+                                "facility_type": facility_catalog[facility]['type'],
+                                "usage_duration": usage_duration,
+                                "created_at": recorded_at
+                            }
+                            for facility in facilities_used
+                        ]).execute()
                     
                     # Set success state
                     st.session_state.feedback_success = True
                     # Reset feedback form state
                     st.session_state.show_feedback = False
                     st.session_state.checkout_visit_id = None
+                    st.session_state.checkout_duration = None
                     st.rerun()
                 except Exception as e:
                     st.error(f"Error saving feedback: {str(e)}")
@@ -175,12 +251,14 @@ def check_in_out_page():
                     ph_check_in_time = check_in_time.astimezone(PH_TIMEZONE)
                     st.write(f"Check-in time: {ph_check_in_time.strftime('%I:%M %p')}")
                     if st.button("Check Out", key=f"checkout_{visit['id']}", type="primary"):
-                        if record_check_out(visit['id']):
+                        checked_out = record_check_out(visit['id'])
+                        if checked_out:
                             user_name = f"{visit['users']['first_name']} {visit['users']['last_name']}"
                             st.success(f"✅ {user_name} checked out successfully!")
                             st.balloons()
                             st.session_state.show_feedback = True
                             st.session_state.checkout_visit_id = visit['id']
+                            st.session_state.checkout_duration = checked_out['duration']
                             st.session_state.feedback_user_name = user_name
                             st.rerun()
         else:
@@ -472,9 +550,8 @@ def user_management_page():
         except Exception as e:
             st.error(f"Error loading users: {str(e)}")
 
-def admin_dashboard_page():
-    st.header("🏢 Admin Dashboard")
-    
+def visit_records_tab():
+    """Visit records for a date range with summary metrics and CSV export"""
     # Date range selection
     col1, col2 = st.columns(2)
     with col1:
@@ -600,24 +677,212 @@ def admin_dashboard_page():
     except Exception as e:
         st.error(f"Error loading dashboard data: {str(e)}")
 
+def admin_dashboard_page():
+    st.header("🏢 Admin Dashboard")
+    
+    records_tab, retention_tab, facilities_tab = st.tabs(["📋 Visit Records", "🔁 Retention & Repeat Visitors", "📦 Facilities & Restocking"])
+
+    with records_tab:
+        visit_records_tab()
+
+    with retention_tab:
+        retention_analytics_tab()
+
+    with facilities_tab:
+        facility_forecast_tab()
+
+def fetch_all_rows(build_query, page_size=1000, key=None):
+    """Page through a query so results aren't truncated at the API row limit.
+
+    build_query is called for every page; query builders accumulate range
+    parameters, so reusing one would send duplicate offset/limit values.
+    With a unique, sortable key the pages are fetched by keyset
+    (key > last seen) so each page is an index range scan rather than an
+    ever-growing OFFSET.
+    """
+    rows = []
+    offset = 0
+    while True:
+        if key:
+            query = build_query().order(key).limit(page_size)
+            if rows:
+                query = query.gt(key, rows[-1][key])
+        else:
+            query = build_query().range(offset, offset + page_size - 1)
+        page = query.execute().data
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        offset += page_size
+
+@st.cache_data(ttl=600, show_spinner="Loading visit history...")
+def load_member_visit_history():
+    """Load each member's check-in times and school/organization for cohort analysis"""
+    return fetch_all_rows(
+        lambda: supabase.table('member_visit_history').select('user_id, school_organization, check_in_times'),
+        key='user_id'
+    )
+
+@st.cache_data(ttl=600, show_spinner="Loading member summaries...")
+def load_member_visit_summary():
+    """Load the precomputed per-member visit summary maintained on check-out"""
+    rows = fetch_all_rows(
+        lambda: supabase.table('member_visit_summary').select(
+            'user_id, first_visit, last_visit, visit_count, total_hours, users!inner(first_name, last_name, school_organization)'
+        ),
+        key='user_id'
+    )
+    return [
+        {
+            'user_id': row['user_id'],
+            'name': f"{row['users']['first_name']} {row['users']['last_name']}",
+            'school_organization': row['users']['school_organization'],
+            'visit_count': row['visit_count'],
+            'total_hours': row['total_hours'],
+            'last_visit': datetime.fromisoformat(row['last_visit']).astimezone(PH_TIMEZONE).strftime('%Y-%m-%d')
+        }
+        for row in rows
+    ]
+
+def retention_analytics_tab():
+    """Cohort retention, visit frequency and school/organization leaderboards over full history"""
+    try:
+        sequences = analytics.build_visit_sequences(load_member_visit_history())
+        summary = load_member_visit_summary()
+    except Exception as e:
+        st.error(f"Error loading retention data: {str(e)}")
+        return
+
+    if sequences.empty:
+        st.info("No visit history yet")
+        return
+
+    return_window = st.slider("Return window (days)", min_value=7, max_value=90, value=30, step=1)
+    return_rate = analytics.return_rate(sequences, within_days=return_window)
+
+    st.markdown("### 📊 Retention Metrics")
+    metric_col1, metric_col2, metric_col3 = st.columns(3)
+    with metric_col1:
+        st.metric("Members", sequences['user_id'].nunique())
+    with metric_col2:
+        st.metric(f"Returned within {return_window} days", f"{return_rate:.0%}" if return_rate is not None else "N/A")
+    with metric_col3:
+        repeat_members = sum(1 for s in summary if s['visit_count'] > 1)
+        st.metric("Repeat Visitors", repeat_members)
+
+    st.markdown("### 🗓️ Monthly Cohort Retention")
+    matrix = analytics.cohort_retention_matrix(sequences)
+    fig = px.imshow(
+        matrix,
+        text_auto=".0%",
+        color_continuous_scale="Reds",
+        aspect="auto",
+        labels={'x': 'Months since first visit', 'y': 'First visit month', 'color': 'Retention'}
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    freq_col, board_col = st.columns(2)
+    with freq_col:
+        st.markdown("### 🔁 Visit Frequency")
+        distribution = analytics.visit_frequency_distribution(summary)
+        fig = px.bar(distribution, x='Visits', y='Members')
+        st.plotly_chart(fig, use_container_width=True)
+    with board_col:
+        st.markdown("### 🏫 Top Schools/Organizations")
+        st.dataframe(analytics.organization_leaderboard(summary), hide_index=True)
+
+    st.markdown("### 🏆 Top Repeat Visitors")
+    st.dataframe(analytics.top_repeat_visitors(summary), hide_index=True)
+
+@st.cache_data(ttl=600, show_spinner="Aggregating facility usage...")
+def load_facility_usage_daily(start_date, end_date):
+    """Load facility usage aggregated per facility per day"""
+    start_datetime = PH_TIMEZONE.localize(datetime.combine(start_date, datetime.min.time()))
+    end_datetime = PH_TIMEZONE.localize(datetime.combine(end_date, datetime.max.time()))
+    return fetch_all_rows(lambda: supabase.rpc(
+        'get_facility_usage_daily',
+        {
+            'start_date': start_datetime.isoformat(),
+            'end_date': end_datetime.isoformat()
+        }
+    ))
+
+def facility_forecast_tab():
+    """Consumable demand and lease-equipment utilization forecasts for restocking"""
+    settings_col1, settings_col2, settings_col3, settings_col4 = st.columns(4)
+    with settings_col1:
+        history_days = st.number_input("History (days)", min_value=14, max_value=365, value=90, step=7)
+    with settings_col2:
+        window = st.number_input("Moving average window (days)", min_value=3, max_value=30, value=7)
+    with settings_col3:
+        horizon = st.number_input("Restock horizon (days)", min_value=1, max_value=60, value=7)
+    with settings_col4:
+        open_hours = st.number_input("Open hours per day", min_value=1, max_value=24, value=8)
+
+    # Forecast from complete days only; today's partial counts would drag the
+    # smoothed level down, so today is kept for the daily usage chart alone
+    end_date = get_ph_time().date()
+    last_full_day = end_date - timedelta(days=1)
+    start_date = last_full_day - timedelta(days=int(history_days) - 1)
+
+    try:
+        usage_rows = load_facility_usage_daily(start_date, end_date)
+    except Exception as e:
+        st.error(f"Error loading facility usage: {str(e)}")
+        return
+
+    if not usage_rows:
+        st.info("No facility usage recorded in this period")
+        return
+
+    uses, hours, facility_types = analytics.daily_facility_usage(usage_rows, start_date, end_date)
+    consumables, lease = analytics.forecast_facility_demand(
+        uses.loc[:last_full_day],
+        hours.loc[:last_full_day],
+        facility_types, window=int(window), horizon=int(horizon), open_hours=open_hours
+    )
+
+    st.markdown("### 🧺 Consumable Demand")
+    if not consumables.empty:
+        st.dataframe(consumables, hide_index=True)
+    else:
+        st.info("No consumable usage in this period")
+
+    st.markdown("### 🖨️ Equipment Utilization")
+    if not lease.empty:
+        st.dataframe(
+            lease,
+            column_config={
+                "Est. Utilization": st.column_config.ProgressColumn(
+                    "Est. Utilization",
+                    help="Approximate: smoothed daily usage hours as a share of open hours, "
+                         "with each visit's duration split evenly across the facilities used",
+                    format="%.0f%%",
+                    min_value=0,
+                    max_value=100
+                )
+            },
+            hide_index=True
+        )
+    else:
+        st.info("No equipment usage in this period")
+
+    st.markdown("### 📈 Daily Usage")
+    daily = uses.rename_axis('Date').reset_index().melt(id_vars='Date', var_name='Facility', value_name='Uses')
+    fig = px.line(daily, x='Date', y='Uses', color='Facility')
+    st.plotly_chart(fig, use_container_width=True)
+
 def record_check_in(user_id):
     try:
-        # Record check-in with Philippine time
-        check_in_time = get_ph_time()
+        # Conditional insert server-side; a second kiosk tapping the same
+        # member gets the already-open visit back instead of a duplicate
+        response = supabase.rpc('check_in_visit', {'p_user_id': user_id}).execute()
         
-        # First check if user is already checked in
-        existing_visit = supabase.table("visits").select("*").eq("user_id", user_id).is_("check_out_time", None).execute()
-        if existing_visit.data:
+        if not response.data or not response.data[0]['created']:
             st.error("User is already checked in!")
             return False
         
-        # Insert visit record
-        supabase.table("visits").insert({
-            "user_id": user_id,
-            "check_in_time": check_in_time.isoformat(),
-            "created_at": check_in_time.isoformat()
-        }).execute()
-        
+        load_today_snapshot.clear()
         return True
     except Exception as e:
         st.error(f"Error recording check-in: {str(e)}")
@@ -625,24 +890,19 @@ def record_check_in(user_id):
 
 def record_check_out(visit_id):
     try:
-        # Find the visit
-        visit = supabase.table("visits").select("*").eq("id", visit_id).single().execute()
+        # Only closes the visit if it is still open, so a repeated tap can't
+        # overwrite an existing check-out time; duration is computed server-side
+        response = supabase.rpc('check_out_visit', {'p_visit_id': visit_id}).execute()
         
-        if visit.data:
-            check_in_time = datetime.fromisoformat(visit.data['check_in_time'])
-            check_out_time = get_ph_time()
-            
-            # Update visit record
-            supabase.table("visits").update({
-                "check_out_time": check_out_time.isoformat(),
-                "duration": (check_out_time.astimezone(pytz.UTC) - check_in_time.astimezone(pytz.UTC)).total_seconds() / 3600  # Duration in hours
-            }).eq("id", visit_id).execute()
-            
-            return True
-            
+        if not response.data:
+            st.warning("This visit was already checked out")
+            return None
+        
+        load_today_snapshot.clear()
+        return response.data[0]
     except Exception as e:
         st.error(f"Error recording check-out: {str(e)}")
-        return False
+        return None
 
 def calculate_age(birthdate):
     """Calculate age from birthdate, considering month and day"""
@@ -654,6 +914,11 @@ def calculate_age(birthdate):
     return age
 
 def main():
+    # Wall display mode (?mode=display) skips navigation and per-session queries
+    if st.query_params.get("mode") == "display":
+        wall_display_page()
+        return
+
     # Sidebar navigation
     with st.sidebar:
         st.title("🏢 Vivita Makerspace")
@@ -670,10 +935,11 @@ def main():
         st.markdown("---")
         st.markdown("### Quick Stats")
         try:
-            active_count = len(load_active_visits())
-            st.metric("Active Users", active_count)
+            snapshot = load_today_snapshot()
+            st.metric("Active Users", snapshot['active_count'] if snapshot else 0)
         except:
             st.error("Could not load stats")
+        st.markdown("[📺 Open wall display](?mode=display)")
     
     # Store the selected page in session state
     if 'current_page' not in st.session_state:
@@ -0,0 +1,91 @@
+-- Concurrency-safe check-in/out. Two kiosks tapping the same member must not
+-- open two visits or overwrite an existing check-out, so both operations are
+-- single conditional statements run server-side.
+
+-- 1. Delete duplicate open visits left behind by earlier races, keeping the
+-- earliest open visit per member. They are removed rather than closed so
+-- the member summary, visit history and today's counts never see them.
+WITH duplicates AS (
+    SELECT v.id
+    FROM visits v
+    WHERE v.check_out_time IS NULL
+    AND EXISTS (
+        SELECT 1 FROM visits o
+        WHERE o.user_id = v.user_id
+        AND o.check_out_time IS NULL
+        AND (o.check_in_time, o.id) < (v.check_in_time, v.id)
+    )
+),
+deleted_feedback AS (
+    DELETE FROM feedback WHERE visit_id IN (SELECT id FROM duplicates)
+),
+deleted_usage AS (
+    DELETE FROM facility_usage WHERE visit_id IN (SELECT id FROM duplicates)
+)
+DELETE FROM visits WHERE id IN (SELECT id FROM duplicates);
+
+-- 2. At most one open visit per member
+CREATE UNIQUE INDEX IF NOT EXISTS idx_visits_one_open_per_user
+    ON visits(user_id)
+    WHERE check_out_time IS NULL;
+
+-- 3. Idempotent check-in: inserts a visit unless one is already open and
+-- returns the open visit either way, with created = false if it existed
+DROP FUNCTION IF EXISTS check_in_visit(uuid);
+
+CREATE OR REPLACE FUNCTION check_in_visit(p_user_id uuid)
+RETURNS TABLE (
+    id uuid,
+    user_id uuid,
+    check_in_time timestamp with time zone,
+    created boolean
+)
+SECURITY DEFINER
+SET search_path = public
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+BEGIN
+    RETURN QUERY
+    INSERT INTO visits (user_id, check_in_time, created_at)
+    VALUES (p_user_id, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+    ON CONFLICT (user_id) WHERE check_out_time IS NULL DO NOTHING
+    RETURNING visits.id, visits.user_id, visits.check_in_time, true;
+
+    IF NOT FOUND THEN
+        RETURN QUERY
+        SELECT v.id, v.user_id, v.check_in_time, false
+        FROM visits v
+        WHERE v.user_id = p_user_id
+        AND v.check_out_time IS NULL;
+    END IF;
+END;
+$$;
+
+-- 4. Conditional check-out: only closes a visit that is still open and
+-- returns the updated row, or no rows if it was already checked out
+DROP FUNCTION IF EXISTS check_out_visit(uuid);
+
+CREATE OR REPLACE FUNCTION check_out_visit(p_visit_id uuid)
+RETURNS TABLE (
+    id uuid,
+    user_id uuid,
+    check_in_time timestamp with time zone,
+    check_out_time timestamp with time zone,
+    duration float
+)
+SECURITY DEFINER
+SET search_path = public
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+BEGIN
+    RETURN QUERY
+    UPDATE visits v
+    SET check_out_time = CURRENT_TIMESTAMP,
+        duration = EXTRACT(EPOCH FROM (CURRENT_TIMESTAMP - v.check_in_time)) / 3600
+    WHERE v.id = p_visit_id
+    AND v.check_out_time IS NULL
+    RETURNING v.id, v.user_id, v.check_in_time, v.check_out_time, v.duration;
+END;
+$$;
@@ -0,0 +1,139 @@
+-- Append-only event log. Every insert, update and delete on the core tables
+-- (including rows removed by cascading deletes) is recorded with a compact
+-- JSON payload and a monotonic sequence number, so rollups and caches can be
+-- rebuilt by replaying events from a checkpoint instead of rescanning tables.
+
+CREATE TABLE IF NOT EXISTS events (
+    seq BIGSERIAL PRIMARY KEY,
+    occurred_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    table_name TEXT NOT NULL,
+    op TEXT NOT NULL CHECK (op IN ('INSERT', 'UPDATE', 'DELETE')),
+    row_id UUID NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb
+);
+
+CREATE INDEX IF NOT EXISTS idx_events_table_name_seq ON events(table_name, seq);
+
+-- Consumer checkpoints: last applied sequence number and serialized state
+CREATE TABLE IF NOT EXISTS event_checkpoints (
+    consumer TEXT PRIMARY KEY,
+    last_seq BIGINT NOT NULL DEFAULT 0,
+    state JSONB NOT NULL DEFAULT '{}'::jsonb,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+DROP TRIGGER IF EXISTS update_event_checkpoints_updated_at ON event_checkpoints;
+CREATE TRIGGER update_event_checkpoints_updated_at
+    BEFORE UPDATE ON event_checkpoints
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+-- Seed the log with existing rows so a replay from zero covers history
+-- recorded before this migration (runs before the triggers are attached)
+INSERT INTO events (occurred_at, table_name, op, row_id, payload)
+SELECT occurred_at, table_name, 'INSERT', row_id, payload
+FROM (
+    SELECT COALESCE(created_at, CURRENT_TIMESTAMP) AS occurred_at, 'users' AS table_name, id AS row_id, to_jsonb(u) AS row_data FROM users u
+    UNION ALL
+    SELECT COALESCE(created_at, CURRENT_TIMESTAMP), 'visits', id, to_jsonb(v) FROM visits v
+    UNION ALL
+    SELECT COALESCE(created_at, CURRENT_TIMESTAMP), 'feedback', id, to_jsonb(f) FROM feedback f
+    UNION ALL
+    SELECT COALESCE(created_at, CURRENT_TIMESTAMP), 'facility_usage', id, to_jsonb(fu) FROM facility_usage fu
+) existing
+CROSS JOIN LATERAL (SELECT jsonb_strip_nulls(row_data - 'id' - 'updated_at') AS payload) p
+WHERE NOT EXISTS (SELECT 1 FROM events)
+ORDER BY occurred_at;
+
+-- Record a row change. Inserts store the new row; updates store the columns
+-- that changed under "new" and the previous row under "old", so consumers can
+-- replace an earlier contribution instead of counting it twice; deletes store
+-- just the row id (the insert event has the rest).
+CREATE OR REPLACE FUNCTION record_event()
+RETURNS TRIGGER
+SECURITY DEFINER
+SET search_path = public
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    new_row jsonb;
+    old_row jsonb;
+    event_payload jsonb := '{}'::jsonb;
+    event_row_id uuid;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        new_row := to_jsonb(NEW);
+        event_payload := jsonb_strip_nulls(new_row - 'id' - 'updated_at');
+        event_row_id := NEW.id;
+    ELSIF TG_OP = 'UPDATE' THEN
+        new_row := to_jsonb(NEW) - 'updated_at';
+        old_row := to_jsonb(OLD) - 'updated_at';
+        SELECT COALESCE(jsonb_object_agg(n.key, n.value), '{}'::jsonb)
+        INTO event_payload
+        FROM jsonb_each(new_row) n
+        WHERE old_row -> n.key IS DISTINCT FROM n.value;
+
+        -- Nothing but updated_at changed
+        IF event_payload = '{}'::jsonb THEN
+            RETURN NULL;
+        END IF;
+        event_payload := jsonb_build_object(
+            'new', event_payload,
+            'old', jsonb_strip_nulls(old_row - 'id')
+        );
+        event_row_id := NEW.id;
+    ELSE
+        event_row_id := OLD.id;
+    END IF;
+
+    -- Serialize writers so sequence numbers become visible in order and a
+    -- consumer reading seq > checkpoint can never skip a late-committing event
+    PERFORM pg_advisory_xact_lock(hashtext('events'));
+
+    INSERT INTO events (table_name, op, row_id, payload)
+    VALUES (TG_TABLE_NAME, TG_OP, event_row_id, event_payload);
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS record_users_events ON users;
+CREATE TRIGGER record_users_events
+    AFTER INSERT OR UPDATE OR DELETE ON users
+    FOR EACH ROW
+    EXECUTE FUNCTION record_event();
+
+DROP TRIGGER IF EXISTS record_visits_events ON visits;
+CREATE TRIGGER record_visits_events
+    AFTER INSERT OR UPDATE OR DELETE ON visits
+    FOR EACH ROW
+    EXECUTE FUNCTION record_event();
+
+DROP TRIGGER IF EXISTS record_feedback_events ON feedback;
+CREATE TRIGGER record_feedback_events
+    AFTER INSERT OR UPDATE OR DELETE ON feedback
+    FOR EACH ROW
+    EXECUTE FUNCTION record_event();
+
+DROP TRIGGER IF EXISTS record_facility_usage_events ON facility_usage;
+CREATE TRIGGER record_facility_usage_events
+    AFTER INSERT OR UPDATE OR DELETE ON facility_usage
+    FOR EACH ROW
+    EXECUTE FUNCTION record_event();
+
+-- Events are append-only
+CREATE OR REPLACE FUNCTION prevent_event_changes()
+RETURNS TRIGGER AS $$
+BEGIN
+    RAISE EXCEPTION 'events is append-only';
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS prevent_events_update_delete ON events;
+CREATE TRIGGER prevent_events_update_delete
+    BEFORE UPDATE OR DELETE ON events
+    FOR EACH ROW
+    EXECUTE FUNCTION prevent_event_changes();
+
+-- Clients can read events but only the SECURITY DEFINER trigger writes them
+REVOKE INSERT, UPDATE, DELETE, TRUNCATE ON events FROM anon, authenticated;
+REVOKE USAGE ON SEQUENCE events_seq_seq FROM anon, authenticated;
@@ -43,3 +43,38 @@ BEGIN
     ORDER BY v.check_in_time DESC;
 END;
 $$;
+
+-- Index for date-range scans of facility usage
+CREATE INDEX IF NOT EXISTS idx_facility_usage_created_at ON facility_usage(created_at);
+
+-- Drop the existing function
+DROP FUNCTION IF EXISTS get_facility_usage_daily(timestamp with time zone, timestamp with time zone);
+
+-- Aggregate facility usage per facility per day (Philippine time)
+CREATE OR REPLACE FUNCTION get_facility_usage_daily(start_date timestamp with time zone, end_date timestamp with time zone)
+RETURNS TABLE (
+    usage_date date,
+    facility_name text,
+    facility_type text,
+    uses bigint,
+    hours float
+)
+SECURITY DEFINER
+SET search_path = public
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        (fu.created_at AT TIME ZONE 'Asia/Manila')::date AS usage_date,
+        fu.facility_name,
+        fu.facility_type,
+        COUNT(*) AS uses,
+        COALESCE(SUM(fu.usage_duration), 0)::float AS hours
+    FROM facility_usage fu
+    WHERE fu.created_at >= start_date
+    AND fu.created_at <= end_date
+    GROUP BY 1, fu.facility_name, fu.facility_type
+    ORDER BY 1, fu.facility_name;
+END;
+$$;
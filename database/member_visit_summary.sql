@@ -0,0 +1,71 @@
+-- Per-member visit summary, kept current on check-out so the retention
+-- dashboard never has to rescan the full visits history for totals
+
+CREATE TABLE IF NOT EXISTS member_visit_summary (
+    user_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    first_visit TIMESTAMP WITH TIME ZONE NOT NULL,
+    last_visit TIMESTAMP WITH TIME ZONE NOT NULL,
+    visit_count INTEGER NOT NULL DEFAULT 0,
+    total_hours FLOAT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_member_visit_summary_visit_count ON member_visit_summary(visit_count DESC);
+CREATE INDEX IF NOT EXISTS idx_visits_user_id_check_in_time ON visits(user_id, check_in_time);
+
+-- Fold a completed visit into the member's summary row
+CREATE OR REPLACE FUNCTION update_member_visit_summary()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO member_visit_summary (user_id, first_visit, last_visit, visit_count, total_hours)
+    VALUES (NEW.user_id, NEW.check_in_time, NEW.check_in_time, 1, COALESCE(NEW.duration, 0))
+    ON CONFLICT (user_id) DO UPDATE SET
+        first_visit = LEAST(member_visit_summary.first_visit, EXCLUDED.first_visit),
+        last_visit = GREATEST(member_visit_summary.last_visit, EXCLUDED.last_visit),
+        visit_count = member_visit_summary.visit_count + 1,
+        total_hours = member_visit_summary.total_hours + EXCLUDED.total_hours,
+        updated_at = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS update_member_visit_summary_on_check_out ON visits;
+CREATE TRIGGER update_member_visit_summary_on_check_out
+    AFTER UPDATE OF check_out_time ON visits
+    FOR EACH ROW
+    WHEN (OLD.check_out_time IS NULL AND NEW.check_out_time IS NOT NULL)
+    EXECUTE FUNCTION update_member_visit_summary();
+
+-- Backfill from existing completed visits
+INSERT INTO member_visit_summary (user_id, first_visit, last_visit, visit_count, total_hours)
+SELECT
+    user_id,
+    MIN(check_in_time),
+    MAX(check_in_time),
+    COUNT(*),
+    COALESCE(SUM(duration), 0)
+FROM visits
+WHERE check_out_time IS NOT NULL
+AND user_id IS NOT NULL
+GROUP BY user_id
+ON CONFLICT (user_id) DO UPDATE SET
+    first_visit = EXCLUDED.first_visit,
+    last_visit = EXCLUDED.last_visit,
+    visit_count = EXCLUDED.visit_count,
+    total_hours = EXCLUDED.total_hours,
+    updated_at = CURRENT_TIMESTAMP;
+
+-- Per-member visit history for building visit sequences: one row per member
+-- with every check-in time, so the app pages through members (not visits)
+-- with keyset pagination on user_id. Filters on user_id are pushed below the
+-- GROUP BY and served by idx_visits_user_id_check_in_time.
+DROP FUNCTION IF EXISTS get_member_visit_history();
+
+CREATE OR REPLACE VIEW member_visit_history AS
+SELECT
+    v.user_id,
+    u.school_organization,
+    array_agg(v.check_in_time ORDER BY v.check_in_time) AS check_in_times
+FROM visits v
+JOIN users u ON v.user_id = u.id
+GROUP BY v.user_id, u.school_organization;
@@ -0,0 +1,85 @@
+-- Materialized "today" snapshot for the wall display. A single row is
+-- recomputed whenever visits or feedback change, so displays only ever
+-- read one row and never query the visits table themselves.
+
+CREATE TABLE IF NOT EXISTS today_snapshot (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    snapshot_date DATE NOT NULL,
+    active_count INTEGER NOT NULL DEFAULT 0,
+    check_ins_today INTEGER NOT NULL DEFAULT 0,
+    avg_rating_today FLOAT,
+    ratings_today INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_visits_check_in_time ON visits(check_in_time);
+CREATE INDEX IF NOT EXISTS idx_visits_open ON visits(check_in_time) WHERE check_out_time IS NULL;
+CREATE INDEX IF NOT EXISTS idx_feedback_created_at ON feedback(created_at);
+
+CREATE OR REPLACE FUNCTION refresh_today_snapshot()
+RETURNS void
+SECURITY DEFINER
+SET search_path = public
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    today date := (CURRENT_TIMESTAMP AT TIME ZONE 'Asia/Manila')::date;
+    day_start timestamp with time zone := today::timestamp AT TIME ZONE 'Asia/Manila';
+    day_end timestamp with time zone := (today + 1)::timestamp AT TIME ZONE 'Asia/Manila';
+BEGIN
+    -- Lock before counting: in READ COMMITTED each statement takes a fresh
+    -- snapshot, so counts computed after acquiring the lock include any
+    -- concurrent write that refreshed the row first
+    PERFORM pg_advisory_xact_lock(hashtext('today_snapshot'));
+
+    INSERT INTO today_snapshot (id, snapshot_date, active_count, check_ins_today, avg_rating_today, ratings_today, updated_at)
+    SELECT
+        1,
+        today,
+        (SELECT COUNT(*) FROM visits WHERE check_out_time IS NULL),
+        (SELECT COUNT(*) FROM visits WHERE check_in_time >= day_start AND check_in_time < day_end),
+        r.avg_rating,
+        r.ratings
+    FROM (
+        SELECT AVG(rating)::float AS avg_rating, COUNT(rating)::integer AS ratings
+        FROM feedback
+        WHERE created_at >= day_start AND created_at < day_end
+    ) r
+    ON CONFLICT (id) DO UPDATE SET
+        snapshot_date = EXCLUDED.snapshot_date,
+        active_count = EXCLUDED.active_count,
+        check_ins_today = EXCLUDED.check_ins_today,
+        avg_rating_today = EXCLUDED.avg_rating_today,
+        ratings_today = EXCLUDED.ratings_today,
+        updated_at = CURRENT_TIMESTAMP;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION refresh_today_snapshot_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_today_snapshot();
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Statement-level so a batch write refreshes the snapshot once
+DROP TRIGGER IF EXISTS refresh_today_snapshot_on_visits ON visits;
+CREATE TRIGGER refresh_today_snapshot_on_visits
+    AFTER INSERT OR UPDATE OR DELETE ON visits
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION refresh_today_snapshot_trigger();
+
+DROP TRIGGER IF EXISTS refresh_today_snapshot_on_feedback ON feedback;
+CREATE TRIGGER refresh_today_snapshot_on_feedback
+    AFTER INSERT OR UPDATE OR DELETE ON feedback
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION refresh_today_snapshot_trigger();
+
+-- Seed the row
+SELECT refresh_today_snapshot();
+
+-- Roll the snapshot over at midnight even when nobody checks in. Requires
+-- the pg_cron extension (Database > Extensions in Supabase); 16:00 UTC is
+-- midnight in Manila.
+-- SELECT cron.schedule('refresh-today-snapshot', '0 16 * * *', 'SELECT refresh_today_snapshot()');
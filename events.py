@@ -0,0 +1,174 @@
+"""Incremental consumers for the append-only events table.
+
+Each consumer keeps its rollup state and the last applied sequence number
+together in event_checkpoints, so it can resume from where it stopped (or be
+reset and rebuilt from zero) without rescanning the source tables.
+
+    python events.py            # apply new events since the checkpoint
+    python events.py --reset    # rebuild from the start of the log
+"""
+import sys
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+import pandas as pd
+import pytz
+
+PH_TIMEZONE = pytz.timezone('Asia/Manila')
+
+def ph_date(timestamp):
+    """PH calendar date (YYYY-MM-DD) of an ISO timestamp"""
+    return datetime.fromisoformat(timestamp).astimezone(PH_TIMEZONE).date().isoformat()
+
+class EventConsumer(ABC):
+    """Replays events in sequence order into a JSON-serializable state"""
+
+    name = None
+    tables = ()
+
+    def __init__(self, client, page_size=1000):
+        self.client = client
+        self.page_size = page_size
+        self.last_seq = 0
+        self.state = self.initial_state()
+
+    def initial_state(self):
+        return {}
+
+    @abstractmethod
+    def apply(self, event):
+        """Fold a single event into self.state"""
+
+    def load_checkpoint(self):
+        response = self.client.table('event_checkpoints').select(
+            'last_seq, state'
+        ).eq('consumer', self.name).execute()
+        if response.data:
+            self.last_seq = response.data[0]['last_seq']
+            self.state = response.data[0]['state'] or self.initial_state()
+        return self.last_seq
+
+    def save_checkpoint(self):
+        # State and position are written together so a crash can't apply events twice
+        self.client.table('event_checkpoints').upsert({
+            'consumer': self.name,
+            'last_seq': self.last_seq,
+            'state': self.state
+        }).execute()
+
+    def reset(self):
+        """Discard state so the next poll replays the log from the beginning"""
+        self.last_seq = 0
+        self.state = self.initial_state()
+        self.save_checkpoint()
+
+    def poll(self):
+        """Apply the next page of events after the checkpoint; returns how many were read"""
+        query = self.client.table('events').select(
+            'seq, occurred_at, table_name, op, row_id, payload'
+        ).gt('seq', self.last_seq)
+        if self.tables:
+            query = query.in_('table_name', list(self.tables))
+        events = query.order('seq').limit(self.page_size).execute().data
+
+        for event in events:
+            self.apply(event)
+            self.last_seq = event['seq']
+
+        if events:
+            self.save_checkpoint()
+        return len(events)
+
+    def catch_up(self):
+        """Poll until the consumer has applied every committed event"""
+        total = 0
+        while True:
+            count = self.poll()
+            total += count
+            if count < self.page_size:
+                return total
+
+class DailyVisitRollup(EventConsumer):
+    """Check-ins, check-outs, visit hours and ratings per PH calendar day.
+
+    Deletes are ignored, so the rollup keeps history that cascading deletes
+    from users have removed from the visits table.
+    """
+
+    name = 'daily_visits'
+    tables = ('visits', 'feedback')
+
+    def _day(self, day):
+        return self.state.setdefault(day, {
+            'check_ins': 0,
+            'check_outs': 0,
+            'hours': 0.0,
+            'ratings': 0,
+            'rating_total': 0
+        })
+
+    def _add_check_in(self, visit, sign):
+        if visit.get('check_in_time'):
+            self._day(ph_date(visit['check_in_time']))['check_ins'] += sign
+
+    def _add_check_out(self, visit, sign):
+        if visit.get('check_out_time'):
+            day = self._day(ph_date(visit['check_out_time']))
+            day['check_outs'] += sign
+            day['hours'] += sign * (visit.get('duration') or 0)
+
+    def _add_rating(self, feedback, occurred_at, sign):
+        if feedback.get('rating') is not None:
+            day = self._day(ph_date(feedback.get('created_at') or occurred_at))
+            day['ratings'] += sign
+            day['rating_total'] += sign * feedback['rating']
+
+    def apply(self, event):
+        payload = event['payload']
+        if event['op'] == 'INSERT':
+            if event['table_name'] == 'visits':
+                self._add_check_in(payload, 1)
+                self._add_check_out(payload, 1)
+            elif event['table_name'] == 'feedback':
+                self._add_rating(payload, event['occurred_at'], 1)
+        elif event['op'] == 'UPDATE':
+            # Replace the previous contribution so corrections aren't double counted
+            old = payload['old']
+            new = {**old, **payload['new']}
+            if event['table_name'] == 'visits':
+                if 'check_in_time' in payload['new']:
+                    self._add_check_in(old, -1)
+                    self._add_check_in(new, 1)
+                self._add_check_out(old, -1)
+                self._add_check_out(new, 1)
+            elif event['table_name'] == 'feedback':
+                self._add_rating(old, event['occurred_at'], -1)
+                self._add_rating(new, event['occurred_at'], 1)
+
+    def to_frame(self):
+        """Rollup as a DataFrame indexed by date"""
+        if not self.state:
+            return pd.DataFrame(columns=['check_ins', 'check_outs', 'hours', 'avg_rating'])
+        df = pd.DataFrame.from_dict(self.state, orient='index').sort_index()
+        df.index = pd.to_datetime(df.index)
+        df['avg_rating'] = (df['rating_total'] / df['ratings'].where(df['ratings'] > 0)).round(2)
+        return df.drop(columns=['rating_total'])
+
+if __name__ == "__main__":
+    import streamlit as st
+    from supabase import create_client
+
+    supabase = create_client(
+        st.secrets["SUPABASE_URL"],
+        st.secrets["SUPABASE_KEY"]
+    )
+
+    rollup = DailyVisitRollup(supabase)
+    rollup.load_checkpoint()
+    if "--reset" in sys.argv:
+        rollup.reset()
+        print("Checkpoint reset, replaying from the start of the log")
+
+    applied = rollup.catch_up()
+    print(f"✅ Applied {applied} events, checkpoint at seq {rollup.last_seq}")
+    print(rollup.to_frame().tail(14))
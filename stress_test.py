@@ -0,0 +1,224 @@
+"""Concurrent check-in/out stress test against a local stand-in database.
+
+Mirrors the check_in_visit / check_out_visit functions in
+database/concurrent_visits.sql on SQLite (same partial unique index and
+conditional statements), then drives many members at once, releasing each
+member's duplicate taps together from separate threads. Every operation
+must complete without error, simultaneous taps must create at most one
+visit, no member may be handed two open visits and no check-out may be
+overwritten. Throughput counts completed operations only.
+
+    python stress_test.py --operations 5000 --workers 32
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+SCHEMA = """
+CREATE TABLE visits (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    check_in_time TEXT NOT NULL,
+    check_out_time TEXT,
+    duration REAL
+);
+CREATE UNIQUE INDEX idx_visits_one_open_per_user ON visits(user_id) WHERE check_out_time IS NULL;
+"""
+
+class LocalVisitStore:
+    """SQLite stand-in for the check-in/out RPCs, one connection per thread"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with sqlite3.connect(path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _conn(self):
+        if not hasattr(self._local, "conn"):
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return self._local.conn
+
+    def check_in(self, user_id):
+        """Return (visit_id, created) for the member's open visit"""
+        now = datetime.now(timezone.utc).isoformat()
+        conn = self._conn()
+        row = conn.execute(
+            "INSERT INTO visits (id, user_id, check_in_time) VALUES (?, ?, ?) "
+            "ON CONFLICT (user_id) WHERE check_out_time IS NULL DO NOTHING "
+            "RETURNING id",
+            (str(uuid.uuid4()), user_id, now)
+        ).fetchone()
+        if row:
+            return row[0], True
+
+        row = conn.execute(
+            "SELECT id FROM visits WHERE user_id = ? AND check_out_time IS NULL",
+            (user_id,)
+        ).fetchone()
+        return (row[0] if row else None), False
+
+    def check_out(self, visit_id):
+        """Return the new check_out_time, or None if the visit was already closed"""
+        now = datetime.now(timezone.utc)
+        row = self._conn().execute(
+            "UPDATE visits SET check_out_time = ?, "
+            "duration = (julianday(?) - julianday(check_in_time)) * 24 "
+            "WHERE id = ? AND check_out_time IS NULL "
+            "RETURNING check_out_time",
+            (now.isoformat(), now.isoformat(), visit_id)
+        ).fetchone()
+        return row[0] if row else None
+
+    def rows(self):
+        with sqlite3.connect(self.path) as conn:
+            return conn.execute("SELECT id, user_id, check_out_time FROM visits").fetchall()
+
+def run_stress_test(operations, workers, users, taps, min_throughput):
+    path = os.path.join(tempfile.mkdtemp(), "visits.db")
+    store = LocalVisitStore(path)
+    member_ids = [str(uuid.uuid4()) for _ in range(users)]
+
+    # Plan each member's actions up front: a check-in, sometimes followed by a
+    # check-out of the visit it returned
+    rng = random.Random(42)
+    plan = defaultdict(list)
+    planned = 0
+    while planned < operations:
+        with_check_out = rng.random() < 0.5
+        plan[rng.choice(member_ids)].append(with_check_out)
+        planned += taps * (2 if with_check_out else 1)
+
+    created_visits = []
+    check_outs = []
+    tap_groups = []
+    errors = Counter()
+    stats = {"submitted": 0, "busy": 0.0}
+    results_lock = threading.Lock()
+
+    def fire(operation, arg):
+        """Run operation(arg) from several threads released at once; returns the results that didn't raise"""
+        barrier = threading.Barrier(taps)
+        outcomes = [None] * taps
+
+        def tap(i):
+            barrier.wait()
+            began = time.perf_counter()
+            try:
+                outcomes[i] = (operation(arg), None)
+            except Exception as e:
+                outcomes[i] = (None, e)
+            with results_lock:
+                stats["busy"] += time.perf_counter() - began
+
+        threads = [threading.Thread(target=tap, args=(i,)) for i in range(taps)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with results_lock:
+            stats["submitted"] += taps
+            for _, error in outcomes:
+                if error:
+                    errors[f"{type(error).__name__}: {error}"] += 1
+        return [result for result, error in outcomes if not error]
+
+    def drive(user_id, actions):
+        """Play one member's actions in order; other members' drivers run alongside"""
+        for with_check_out in actions:
+            # Several kiosks tap the same member at once
+            group = fire(store.check_in, user_id)
+            with results_lock:
+                tap_groups.append(group)
+                created_visits.extend(visit_id for visit_id, created in group if created)
+
+            if with_check_out:
+                for visit_id in {visit_id for visit_id, _ in group if visit_id}:
+                    closed = [t for t in fire(store.check_out, visit_id) if t]
+                    with results_lock:
+                        check_outs.extend((visit_id, check_out_time) for check_out_time in closed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as drivers:
+        member_runs = [drivers.submit(drive, user_id, actions) for user_id, actions in plan.items()]
+    for run in member_runs:
+        run.result()
+    elapsed = time.perf_counter() - start
+
+    rows = store.rows()
+    submitted = stats["submitted"]
+    completed = submitted - sum(errors.values())
+    throughput = completed / elapsed
+    failures = [f"{count} operations raised {error}" for error, count in errors.items()]
+
+    # Simultaneous taps must create at most one visit between them
+    duplicate_groups = sum(
+        1 for group in tap_groups
+        if sum(created for _, created in group) > 1
+    )
+    if duplicate_groups:
+        failures.append(f"{duplicate_groups} simultaneous tap groups created more than one visit")
+
+    # From what the operations reported, no member may hold two open visits
+    visit_owner = {visit_id: user_id for visit_id, user_id, _ in rows}
+    open_per_user = Counter(visit_owner.get(visit_id) for visit_id in created_visits)
+    open_per_user.subtract(visit_owner.get(visit_id) for visit_id, _ in check_outs)
+    duplicated = [user_id for user_id, count in open_per_user.items() if count > 1]
+    if duplicated:
+        failures.append(f"{len(duplicated)} members were given more than one open visit")
+
+    if len(rows) != len(created_visits):
+        failures.append(f"{len(rows)} visits stored but {len(created_visits)} check-ins reported as created")
+
+    closed_per_visit = Counter(visit_id for visit_id, _ in check_outs)
+    repeated = [visit_id for visit_id, count in closed_per_visit.items() if count > 1]
+    if repeated:
+        failures.append(f"{len(repeated)} visits were checked out more than once")
+
+    stored_check_outs = {visit_id: check_out_time for visit_id, _, check_out_time in rows if check_out_time}
+    overwritten = [visit_id for visit_id, check_out_time in check_outs if stored_check_outs.get(visit_id) != check_out_time]
+    if overwritten:
+        failures.append(f"{len(overwritten)} check-out times were overwritten")
+    if len(stored_check_outs) != len(check_outs):
+        failures.append(f"{len(stored_check_outs)} closed visits but {len(check_outs)} check-outs reported")
+
+    if throughput < min_throughput:
+        failures.append(f"Throughput {throughput:.0f} ops/s below minimum {min_throughput} ops/s")
+
+    print(f"Operations: {completed} completed of {submitted} ({taps} simultaneous taps each), {workers} members at a time")
+    print(f"Visits created: {len(created_visits)}, checked out: {len(check_outs)}, still open: {len(rows) - len(stored_check_outs)}")
+    print(f"Elapsed: {elapsed:.2f}s, throughput: {throughput:.0f} ops/s, average in flight: {stats['busy'] / elapsed:.1f}")
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--operations", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=32, help="Members driven concurrently")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--taps", type=int, default=2, help="Simultaneous duplicate taps per action")
+    parser.add_argument("--min-throughput", type=float, default=200, help="Minimum operations per second")
+    args = parser.parse_args()
+
+    print("Running concurrent check-in/out stress test...")
+    failures = run_stress_test(args.operations, args.workers, args.users, args.taps, args.min_throughput)
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+
+    print("✅ All invariants held")
+    sys.exit(0)